@@ -0,0 +1,114 @@
+import hashlib
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def hashed_embedding(text, dimensions=256):
+    # Local stand-in for an embedding API: hashed bag of words, usable offline
+    vector = np.zeros(dimensions, dtype=np.float32)
+    for token in re.findall(r"[a-z0-9]+", text.lower()):
+        digest = hashlib.md5(token.encode("utf-8")).digest()
+        vector[int.from_bytes(digest[:4], "little") % dimensions] += 1.0
+    return vector
+
+
+class SemanticAnswerCache:
+    """Answer cache looked up by embedding similarity of the optimized question.
+
+    ``embed`` is any callable turning text into a vector. Entries are only
+    matched within the same complexity level, expire after ``ttl_seconds``
+    and the least recently used ones are dropped beyond ``max_entries``.
+    The vector of a missed lookup is kept so storing that question's answer
+    doesn't embed it again.
+    """
+
+    def __init__(self, embed, similarity_threshold=0.92, ttl_seconds=24 * 3600, max_entries=500):
+        self.embed = embed
+        self.similarity_threshold = similarity_threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = []
+        self._vectors = None
+        self._missed_vectors = OrderedDict()
+        self._lock = threading.Lock()
+
+    def lookup(self, question, level):
+        query = self._normalize(self.embed(question))
+        with self._lock:
+            self._drop_expired(time.time())
+            match = self._best_match(query, level)
+            if match is None:
+                self.misses += 1
+                # A miss is usually followed by storing the answer for the same question
+                self._missed_vectors[question] = query
+                self._missed_vectors.move_to_end(question)
+                while len(self._missed_vectors) > self.max_entries:
+                    self._missed_vectors.popitem(last=False)
+                return None
+            entry, similarity = match
+            entry['last_used'] = time.time()
+            self.hits += 1
+        logger.info(f"Answer cache hit ({similarity:.3f}) for: {question}")
+        return entry['answer']
+
+    def store(self, question, level, full_response, text_message, articles):
+        with self._lock:
+            vector = self._missed_vectors.pop(question, None)
+        if vector is None:
+            vector = self._normalize(self.embed(question))
+        now = time.time()
+        with self._lock:
+            self._entries.append({
+                'question': question,
+                'level': level,
+                'vector': vector,
+                'created': now,
+                'last_used': now,
+                'answer': {
+                    'full_response': full_response,
+                    'text_message': text_message,
+                    'articles': list(articles)
+                }
+            })
+            if len(self._entries) > self.max_entries:
+                self._entries.sort(key=lambda entry: entry['last_used'])
+                del self._entries[:len(self._entries) - self.max_entries]
+            self._vectors = None
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries)}
+
+    def _best_match(self, query, level):
+        if not self._entries:
+            return None
+        if self._vectors is None:
+            self._vectors = np.stack([entry['vector'] for entry in self._entries])
+        similarities = self._vectors @ query
+        levels = np.array([entry['level'] == level for entry in self._entries])
+        similarities = np.where(levels, similarities, -1.0)
+        best = int(np.argmax(similarities))
+        if similarities[best] < self.similarity_threshold:
+            return None
+        return self._entries[best], float(similarities[best])
+
+    def _drop_expired(self, now):
+        live_entries = [entry for entry in self._entries if now - entry['created'] < self.ttl_seconds]
+        if len(live_entries) != len(self._entries):
+            self._entries = live_entries
+            self._vectors = None
+
+    @staticmethod
+    def _normalize(vector):
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
@@ -0,0 +1,88 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class ArticleStore:
+    """On-disk cache of parsed PubMed articles keyed by PMID.
+
+    Entries older than ``ttl_seconds`` are treated as missing, and once the
+    store holds more than ``max_entries`` articles the least recently read
+    ones are evicted.
+    """
+
+    def __init__(self, path="article_store.sqlite3", ttl_seconds=7 * 24 * 3600, max_entries=5000):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS articles (
+                    pmid TEXT PRIMARY KEY,
+                    data TEXT NOT NULL,
+                    fetched_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_articles_accessed_at ON articles (accessed_at)")
+        logger.info(f"Article store opened at {path}")
+
+    def get_many(self, pmids):
+        pmids = list(dict.fromkeys(pmids))
+        if not pmids:
+            return {}
+
+        now = time.time()
+        placeholders = ','.join('?' for _ in pmids)
+        with self._lock, self._conn:
+            rows = self._conn.execute(
+                f"SELECT pmid, data FROM articles WHERE pmid IN ({placeholders}) AND fetched_at >= ?",
+                (*pmids, now - self.ttl_seconds)
+            ).fetchall()
+            if rows:
+                self._conn.executemany(
+                    "UPDATE articles SET accessed_at = ? WHERE pmid = ?",
+                    [(now, pmid) for pmid, _ in rows]
+                )
+
+        articles = {pmid: json.loads(data) for pmid, data in rows}
+        logger.info(f"Article store hits: {len(articles)}/{len(pmids)}")
+        return articles
+
+    def put_many(self, articles):
+        now = time.time()
+        rows = [
+            (article['id'], json.dumps(article), now, now)
+            for article in articles
+            if article.get('id') and article['id'] != 'No ID'
+        ]
+        if not rows:
+            return
+
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO articles (pmid, data, fetched_at, accessed_at) VALUES (?, ?, ?, ?)",
+                rows
+            )
+            self._evict(now)
+        logger.info(f"Article store saved {len(rows)} articles")
+
+    def _evict(self, now):
+        self._conn.execute("DELETE FROM articles WHERE fetched_at < ?", (now - self.ttl_seconds,))
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM articles").fetchone()
+        overflow = count - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM articles WHERE pmid IN (SELECT pmid FROM articles ORDER BY accessed_at ASC LIMIT ?)",
+                (overflow,)
+            )
+            logger.info(f"Article store evicted {overflow} least recently used articles")
@@ -0,0 +1,110 @@
+import argparse
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from pipeline import CONTEXT_LIMITS, run_pipeline
+
+logger = logging.getLogger(__name__)
+
+
+def read_questions(path, default_level):
+    with open(path, "r") as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                logger.warning(f"Skipping line {line_number} of {path}: invalid JSON ({e})")
+                continue
+            question = record.get('question') if isinstance(record, dict) else None
+            if not isinstance(question, str) or not question.strip():
+                logger.warning(f"Skipping line {line_number} of {path}: no question")
+                continue
+            level = record.get('level', default_level)
+            if level not in CONTEXT_LIMITS:
+                logger.warning(f"Skipping line {line_number} of {path}: unknown level {level!r}")
+                continue
+            yield {
+                'id': str(record.get('id', line_number)),
+                'question': question,
+                'level': level
+            }
+
+
+def read_completed_ids(path):
+    # Records written before a crash are kept; only successful ones are skipped on resume
+    completed = set()
+    if not os.path.exists(path):
+        return completed
+    with open(path, "r") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # Partially written last line
+            if not record.get('error'):
+                completed.add(str(record['id']))
+    return completed
+
+
+def end_last_line(path):
+    # A crash can leave a partial last line; new records must not be appended onto it
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return
+    with open(path, "rb+") as f:
+        f.seek(-1, os.SEEK_END)
+        if f.read(1) != b"\n":
+            f.write(b"\n")
+
+
+def answer_question(item):
+    try:
+        result = run_pipeline(item['question'], item['level'])
+    except Exception as e:
+        logger.exception(f"Question {item['id']} failed")
+        return {**item, 'error': str(e)}
+    return {
+        **item,
+        'answer': result['answer'],
+        'text_message': result['text_message'],
+        'pmids': result['pmids'],
+        'cached': result['cached'],
+        'timings': result['timings'],
+        'trace': result['trace']
+    }
+
+
+def run_batch(input_path, output_path, concurrency=4, default_level="Parent"):
+    completed = read_completed_ids(output_path)
+    pending = [item for item in read_questions(input_path, default_level) if item['id'] not in completed]
+    logger.info(f"Batch: {len(pending)} questions to answer, {len(completed)} already done")
+
+    end_last_line(output_path)
+    with open(output_path, "a") as output, ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = [executor.submit(answer_question, item) for item in pending]
+        # Results are written as soon as each question finishes, not in input order
+        for future in as_completed(futures):
+            record = future.result()
+            output.write(json.dumps(record) + "\n")
+            output.flush()
+            logger.info(f"Batch: question {record['id']} {'failed' if record.get('error') else 'done'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Answer a JSONL file of questions without the Streamlit UI.")
+    parser.add_argument("input", help="JSONL with one {\"id\", \"question\", \"level\"} object per line")
+    parser.add_argument("output", help="JSONL to append results to; existing successful ids are skipped")
+    parser.add_argument("--concurrency", type=int, default=4, help="Questions processed at the same time")
+    parser.add_argument("--level", default="Parent", choices=list(CONTEXT_LIMITS), help="Level for questions that don't set one")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO,
+                        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    run_batch(args.input, args.output, concurrency=args.concurrency, default_level=args.level)
+
+
+if __name__ == "__main__":
+    main()
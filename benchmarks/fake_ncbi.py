@@ -0,0 +1,118 @@
+"""Local stand-in for the NCBI E-utilities esearch/efetch endpoints.
+
+Articles come from a PubMed XML fixture. esearch matches every whitespace
+separated term (or any term when the query contains OR) against titles and
+abstracts, and supports ``usehistory``; efetch serves by ``id`` or by
+``WebEnv``/``query_key`` with ``retstart``/``retmax``.
+"""
+import itertools
+import json
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from xml.etree import ElementTree
+
+FIXTURE_PATH = os.path.join(os.path.dirname(__file__), "fixtures", "pubmed_articles.xml")
+
+
+def load_fixture(path=FIXTURE_PATH):
+    articles = {}
+    for element in ElementTree.parse(path).getroot().findall("PubmedArticle"):
+        pmid = element.find('.//ArticleId[@IdType="pubmed"]').text
+        text = " ".join(element.itertext()).lower()
+        articles[pmid] = (ElementTree.tostring(element, encoding="unicode"), text)
+    return articles
+
+
+class FakeNCBIServer:
+    def __init__(self, fixture_path=FIXTURE_PATH, latency=0.05, host="127.0.0.1", port=0):
+        self.articles = load_fixture(fixture_path)
+        self.latency = latency
+        self.requests = 0
+        self._histories = {}
+        self._webenv_ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/entrez/eutils/"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-ncbi", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def search(self, term):
+        if " or " in term.lower():
+            terms = [t.strip().lower() for t in re.split(r"\s+or\s+", term, flags=re.IGNORECASE) if t.strip()]
+            matches = lambda text: any(t in text for t in terms)
+        else:
+            terms = term.lower().split()
+            matches = lambda text: all(t in text for t in terms)
+        return [pmid for pmid, (_, text) in self.articles.items() if matches(text)]
+
+    def _handler_class(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                with fake._lock:
+                    fake.requests += 1
+                time.sleep(fake.latency)
+                url = urlparse(self.path)
+                params = {key: values[0] for key, values in parse_qs(url.query).items()}
+                if url.path.endswith("esearch.fcgi"):
+                    self._esearch(params)
+                elif url.path.endswith("efetch.fcgi"):
+                    self._efetch(params)
+                else:
+                    self._send(404, "text/plain", b"not found")
+
+            def _esearch(self, params):
+                id_list = fake.search(params.get("term", ""))
+                result = {
+                    'count': str(len(id_list)),
+                    'idlist': id_list[:int(params.get("retmax", 20))]
+                }
+                if params.get("usehistory") == "y":
+                    webenv = f"FAKE_WEBENV_{next(fake._webenv_ids)}"
+                    with fake._lock:
+                        fake._histories[webenv] = id_list
+                    result.update({'webenv': webenv, 'querykey': "1"})
+                self._send(200, "application/json", json.dumps({'esearchresult': result}).encode("utf-8"))
+
+            def _efetch(self, params):
+                if "WebEnv" in params:
+                    with fake._lock:
+                        history = fake._histories.get(params["WebEnv"], [])
+                    start = int(params.get("retstart", 0))
+                    id_list = history[start:start + int(params.get("retmax", 20))]
+                else:
+                    id_list = [pmid for pmid in params.get("id", "").split(",") if pmid]
+                records = [fake.articles[pmid][0] for pmid in id_list if pmid in fake.articles]
+                body = '<?xml version="1.0" encoding="UTF-8"?>\n<PubmedArticleSet>' + "".join(records) + "</PubmedArticleSet>"
+                self._send(200, "text/xml", body.encode("utf-8"))
+
+            def _send(self, status, content_type, body):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,206 @@
+"""Local stand-in for the parts of the OpenAI API the pipeline uses.
+
+Serves assistants, threads, messages, streamed runs (server-sent events)
+and embeddings. Each run answers the last user message on its thread with
+canned text sized for the pipeline stage its instructions belong to,
+emitting one word per delta after ``latency`` seconds at ``token_rate``
+words per second.
+"""
+import hashlib
+import itertools
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FILLER_WORDS = (
+    "Research on young children suggests that consistent routines, responsive care and patience help most "
+    "families, and parents can adapt these findings to their own child (Smith 2021)."
+).split()
+STOPWORDS = set("a an and are at do for how i in is it my of on or should the to what when with".split())
+
+
+def canned_reply(prompt, instructions=""):
+    # Recognise each pipeline stage from its run instructions and answer in the expected shape
+    instructions = (instructions or "").lower()
+    if "optimized revised question" in instructions:
+        match = re.search(r"^question: (.*)", prompt, re.IGNORECASE | re.MULTILINE)
+        return match.group(1).strip() if match else prompt
+    if "academic keywords" in instructions:
+        match = re.search(r"^research question: (.*)", prompt, re.IGNORECASE | re.MULTILINE)
+        words = re.findall(r"[a-z]+", re.sub(r"'s\b", "", (match.group(1) if match else prompt).lower()))
+        return ", ".join([word for word in words if word not in STOPWORDS][:4])
+    if "concise text message" in instructions:
+        return "Keep bedtime calm and consistent, it usually passes in a few weeks. 😴💤 This is not medical advice, this is research. Always check with your doctor before making any choices based on this response."
+    words = 1000 if "brilliance" in instructions else 150
+    return " ".join(itertools.islice(itertools.cycle(FILLER_WORDS), words))
+
+
+class FakeOpenAIServer:
+    def __init__(self, latency=0.5, token_rate=50.0, host="127.0.0.1", port=0):
+        self.latency = latency
+        self.token_rate = token_rate
+        self.runs = 0
+        self._threads = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-openai", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def new_id(self, prefix):
+        return f"{prefix}_{next(self._ids)}"
+
+    def _handler_class(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                parts = self.path.split("?")[0].strip("/").split("/")
+                if parts[1:2] == ["assistants"]:
+                    self._json(self._assistant(parts[2]))
+                elif parts[1:2] == ["threads"] and parts[3:4] == ["runs"]:
+                    self._json({'object': "list", 'data': [], 'first_id': None, 'last_id': None, 'has_more': False})
+                else:
+                    self._json({'error': {'message': "not found"}}, status=404)
+
+            def do_DELETE(self):
+                thread_id = self.path.strip("/").split("/")[2]
+                with fake._lock:
+                    fake._threads.pop(thread_id, None)
+                self._json({'id': thread_id, 'object': "thread.deleted", 'deleted': True})
+
+            def do_POST(self):
+                body = self._body()
+                parts = self.path.split("?")[0].strip("/").split("/")
+                if parts[1:] == ["assistants"]:
+                    self._json(self._assistant(fake.new_id("asst")))
+                elif parts[1:] == ["threads"]:
+                    thread_id = fake.new_id("thread")
+                    with fake._lock:
+                        fake._threads[thread_id] = []
+                    self._json({'id': thread_id, 'object': "thread", 'created_at': int(time.time()), 'metadata': {}})
+                elif parts[1:2] == ["threads"] and parts[3:] == ["messages"]:
+                    self._json(self._add_message(parts[2], body))
+                elif parts[1:2] == ["threads"] and parts[3:] == ["runs"]:
+                    self._stream_run(parts[2], body)
+                elif parts[1:] == ["embeddings"]:
+                    self._json(self._embeddings(body))
+                else:
+                    self._json({'error': {'message': "not found"}}, status=404)
+
+            def _assistant(self, assistant_id):
+                return {
+                    'id': assistant_id, 'object': "assistant", 'created_at': int(time.time()),
+                    'name': "Research Assistant", 'model': "gpt-4o-mini", 'instructions': "",
+                    'tools': [], 'metadata': {}
+                }
+
+            def _add_message(self, thread_id, body):
+                content = body.get("content", "")
+                if not isinstance(content, str):
+                    content = " ".join(part.get("text", "") for part in content)
+                with fake._lock:
+                    fake._threads.setdefault(thread_id, []).append(content)
+                return self._message(fake.new_id("msg"), thread_id, body.get("role", "user"), content)
+
+            def _message(self, message_id, thread_id, role, text, status="completed"):
+                return {
+                    'id': message_id, 'object': "thread.message", 'created_at': int(time.time()),
+                    'thread_id': thread_id, 'role': role, 'status': status, 'attachments': [], 'metadata': {},
+                    'content': [{'type': "text", 'text': {'value': text, 'annotations': []}}] if text else []
+                }
+
+            def _stream_run(self, thread_id, body):
+                with fake._lock:
+                    fake.runs += 1
+                    messages = list(fake._threads.get(thread_id, []))
+                prompt = messages[-1] if messages else ""
+                words = canned_reply(prompt, body.get("additional_instructions")).split(" ")
+                # One word per token is close enough for honouring the run's output cap
+                max_tokens = body.get("max_completion_tokens")
+                incomplete = bool(max_tokens) and len(words) > max_tokens
+                if incomplete:
+                    words = words[:max_tokens]
+                run_id = fake.new_id("run")
+                message_id = fake.new_id("msg")
+                run = {
+                    'id': run_id, 'object': "thread.run", 'created_at': int(time.time()), 'thread_id': thread_id,
+                    'assistant_id': body.get("assistant_id"), 'status': "queued", 'model': body.get("model", "gpt-4o-mini"),
+                    'instructions': "", 'tools': [], 'metadata': {}, 'parallel_tool_calls': True
+                }
+
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                self.close_connection = True
+
+                self._event("thread.run.created", run)
+                self._event("thread.run.in_progress", {**run, 'status': "in_progress"})
+                time.sleep(fake.latency)
+                self._event("thread.message.created", self._message(message_id, thread_id, "assistant", "", "in_progress"))
+                for index, word in enumerate(words):
+                    value = word if index == 0 else " " + word
+                    self._event("thread.message.delta", {
+                        'id': message_id, 'object': "thread.message.delta",
+                        'delta': {'content': [{'index': 0, 'type': "text", 'text': {'value': value, 'annotations': []}}]}
+                    })
+                    time.sleep(1 / fake.token_rate)
+                text = " ".join(words)
+                self._event("thread.message.completed", self._message(message_id, thread_id, "assistant", text))
+                usage = {'prompt_tokens': len(prompt) // 4, 'completion_tokens': len(words), 'total_tokens': len(prompt) // 4 + len(words)}
+                if incomplete:
+                    self._event("thread.run.incomplete", {**run, 'status': "incomplete", 'usage': usage, 'incomplete_details': {'reason': "max_completion_tokens"}})
+                else:
+                    self._event("thread.run.completed", {**run, 'status': "completed", 'usage': usage})
+                self.wfile.write(b"event: done\ndata: [DONE]\n\n")
+                self.wfile.flush()
+                with fake._lock:
+                    fake._threads.setdefault(thread_id, []).append(text)
+
+            def _embeddings(self, body):
+                inputs = body.get("input", "")
+                inputs = inputs if isinstance(inputs, list) else [inputs]
+                data = []
+                for index, text in enumerate(inputs):
+                    digest = hashlib.sha256(str(text).lower().encode("utf-8")).digest()
+                    data.append({'object': "embedding", 'index': index, 'embedding': [byte / 255 for byte in digest]})
+                return {'object': "list", 'data': data, 'model': body.get("model"), 'usage': {'prompt_tokens': 0, 'total_tokens': 0}}
+
+            def _event(self, name, data):
+                self.wfile.write(f"event: {name}\ndata: {json.dumps(data)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+
+            def _body(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                return json.loads(self.rfile.read(length) or b"{}")
+
+            def _json(self, payload, status=200):
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,184 @@
+"""Offline end-to-end benchmark for the question pipeline.
+
+Starts local stand-ins for NCBI E-utilities and the OpenAI Assistants API,
+points the real pipeline at them through a throwaway secrets file and runs
+N concurrent simulated sessions. Reports end-to-end latency percentiles,
+time to first answer token, requests/s, per-stage latencies and peak RSS.
+No network access is needed.
+
+    python benchmarks/run_benchmark.py --sessions 8 --requests 4
+"""
+import argparse
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARK_DIR))
+sys.path.insert(0, BENCHMARK_DIR)
+
+from fake_ncbi import FakeNCBIServer  # noqa: E402
+from fake_openai import FakeOpenAIServer  # noqa: E402
+
+QUESTIONS = [
+    "How do I handle my toddler's sleep regression?",
+    "Is it safe to switch infant formula brands?",
+    "How much screen time is okay for a 3 year old?",
+    "Are childhood vaccines safe?",
+    "What helps with teething pain?",
+    "My preschooler is a picky eater, what should I do?",
+    "How should I respond to toddler tantrums?",
+    "When should I introduce peanuts to prevent peanut allergy?",
+]
+
+
+def write_secrets(directory, ncbi_url, openai_url, args):
+    # Cold runs disable every cache so each request does the full pipeline
+    cold = args.cold
+    # Optional second source: the fixture file read locally, behind its own latency and deadline
+    fixture_source = "" if args.fixture_latency is None else f"""
+[sources.fixture]
+path = "{os.path.join(BENCHMARK_DIR, 'fixtures', 'pubmed_articles.xml')}"
+latency_seconds = {args.fixture_latency}
+deadline_seconds = {args.fixture_deadline}
+"""
+    secrets = f"""
+[openai]
+api_key = "benchmark"
+base_url = "{openai_url}"
+requests_per_minute = {args.openai_rpm}
+
+[ncbi]
+base_url = "{ncbi_url}"
+requests_per_second = {args.ncbi_rps}
+
+[assistant]
+id = "asst_benchmark"
+
+[article_store]
+path = "{os.path.join(directory, 'article_store.sqlite3')}"
+max_entries = {0 if cold else 5000}
+
+[search_cache]
+max_entries = {0 if cold else 1000}
+
+[answer_cache]
+embedding = "local"
+max_entries = {0 if cold else 500}
+
+[rerank]
+index_only = {'false' if cold else 'true'}
+
+[keywords]
+extractor = "{args.keywords}"
+{fixture_source}"""
+    os.makedirs(os.path.join(directory, ".streamlit"), exist_ok=True)
+    with open(os.path.join(directory, ".streamlit", "secrets.toml"), "w") as f:
+        f.write(secrets)
+
+
+class FirstTokenPlaceholder:
+    # Stands in for st.empty() and records when the answer first renders
+    def __init__(self):
+        self.first_render = None
+
+    def markdown(self, text):
+        if self.first_render is None:
+            self.first_render = time.perf_counter()
+
+
+def percentiles(values):
+    if not values:
+        return {}
+    return {f"p{q}": round(float(np.percentile(values, q)), 4) for q in (50, 95, 99)}
+
+
+def run_session(pipeline, session_index, requests_per_session, level):
+    samples = []
+    for request_index in range(requests_per_session):
+        question = QUESTIONS[(session_index + request_index) % len(QUESTIONS)]
+        placeholder = FirstTokenPlaceholder()
+        start = time.perf_counter()
+        result = pipeline.run_pipeline(question, level, placeholder=placeholder)
+        end = time.perf_counter()
+        samples.append({
+            'latency': end - start,
+            'first_token': placeholder.first_render - start if placeholder.first_render else None,
+            'cached': result['cached']
+        })
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline end-to-end pipeline benchmark.")
+    parser.add_argument("--sessions", type=int, default=4, help="Concurrent simulated sessions")
+    parser.add_argument("--requests", type=int, default=3, help="Questions asked per session")
+    parser.add_argument("--level", default="Parent", choices=["Parent", "Doctor/Researcher"])
+    parser.add_argument("--cold", action="store_true", help="Disable all caches")
+    parser.add_argument("--keywords", default="llm", choices=["llm", "local"], help="Keyword extractor to run with")
+    parser.add_argument("--ncbi-latency", type=float, default=0.05, help="Seconds per fake E-utilities call")
+    parser.add_argument("--ncbi-rps", type=float, default=10, help="NCBI rate limit to run under")
+    parser.add_argument("--openai-latency", type=float, default=0.3, help="Seconds before the first token of each run")
+    parser.add_argument("--token-rate", type=float, default=200, help="Streamed words per second per run")
+    parser.add_argument("--openai-rpm", type=float, default=60000, help="OpenAI run rate limit to run under")
+    parser.add_argument("--fixture-latency", type=float, help="Also search the fixture file as a local source with this delay")
+    parser.add_argument("--fixture-deadline", type=float, default=1.0, help="Deadline for the local fixture source")
+    parser.add_argument("--json", help="Also write the report to this file")
+    args = parser.parse_args()
+
+    ncbi_server = FakeNCBIServer(latency=args.ncbi_latency).start()
+    openai_server = FakeOpenAIServer(latency=args.openai_latency, token_rate=args.token_rate).start()
+    workdir = tempfile.mkdtemp(prefix="pipeline-benchmark-")
+    write_secrets(workdir, ncbi_server.base_url, openai_server.base_url, args)
+
+    # Streamlit resolves the project secrets file from the working directory at import time
+    os.chdir(workdir)
+    import pipeline
+    from metrics import METRICS
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.sessions) as executor:
+        futures = [
+            executor.submit(run_session, pipeline, session_index, args.requests, args.level)
+            for session_index in range(args.sessions)
+        ]
+        samples = [sample for future in futures for sample in future.result()]
+    elapsed = time.perf_counter() - started
+
+    stages = {
+        histogram['labels']['stage']: {key: round(histogram[key], 4) for key in ("p50", "p95", "p99")}
+        for histogram in METRICS.snapshot()['histograms']
+        if histogram['name'] == "pipeline_stage_seconds"
+    }
+    report = {
+        'sessions': args.sessions,
+        'requests': len(samples),
+        'cached_requests': sum(sample['cached'] for sample in samples),
+        'elapsed_seconds': round(elapsed, 3),
+        'requests_per_second': round(len(samples) / elapsed, 3),
+        'latency_seconds': percentiles([sample['latency'] for sample in samples]),
+        'time_to_first_token_seconds': percentiles([sample['first_token'] for sample in samples if sample['first_token'] is not None]),
+        'stage_seconds': stages,
+        'ncbi_requests': ncbi_server.requests,
+        'openai_runs': openai_server.runs,
+        # ru_maxrss is reported in kilobytes on Linux
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    }
+
+    ncbi_server.stop()
+    openai_server.stop()
+
+    print(json.dumps(report, indent=2))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+import logging
+import re
+import threading
+from collections import Counter
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+STOPWORDS = frozenset("""
+a an and are as at be but by can do does for from how i if in into is it its my of on or should so
+than that the their there these they this to was what when where which while who why will with you your
+""".split())
+
+
+def tokenize(text):
+    return [token for token in re.findall(r"[a-z0-9]+", (text or "").lower()) if token not in STOPWORDS]
+
+
+class BM25Index:
+    """In-memory inverted index over article titles and abstracts scored with BM25.
+
+    Articles are keyed by PMID. Once more than ``max_documents`` are held the
+    oldest half is dropped and the postings are rebuilt.
+    """
+
+    def __init__(self, k1=1.5, b=0.75, max_documents=20000):
+        self.k1 = k1
+        self.b = b
+        self.max_documents = max_documents
+        self._articles = []
+        self._positions = {}
+        self._lengths = []
+        self._postings = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._articles)
+
+    def add(self, articles):
+        with self._lock:
+            for article in articles:
+                pmid = article.get('id')
+                if not pmid or pmid == 'No ID' or pmid in self._positions:
+                    continue
+                self._index(article)
+            if len(self._articles) > self.max_documents:
+                self._rebuild(self._articles[len(self._articles) // 2:])
+
+    def rank(self, query, articles, top_k):
+        # Re-orders the given articles by BM25 score against the query, best first
+        self.add(articles)
+        with self._lock:
+            positions = [self._positions.get(article.get('id')) for article in articles]
+            scores = self._scores(tokenize(query))
+        ranked = sorted(
+            range(len(articles)),
+            key=lambda i: scores[positions[i]] if positions[i] is not None else 0.0,
+            reverse=True
+        )
+        return [articles[i] for i in ranked[:top_k]]
+
+    def search(self, query, top_k, min_coverage=1.0):
+        # Best indexed articles containing at least min_coverage of the query terms
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+        with self._lock:
+            if not self._articles:
+                return []
+            scores = self._scores(terms)
+            matched = np.zeros(len(self._articles), dtype=np.int32)
+            for term in terms:
+                postings = self._postings.get(term)
+                if postings:
+                    matched[np.fromiter(postings.keys(), dtype=np.int64)] += 1
+            eligible = np.flatnonzero(matched >= min_coverage * len(terms))
+            best = eligible[np.argsort(scores[eligible])[::-1][:top_k]]
+            return [self._articles[position] for position in best]
+
+    def document_frequencies(self, terms):
+        # Number of indexed articles, and how many of them contain each term
+        with self._lock:
+            return len(self._articles), {term: len(self._postings.get(term, ())) for term in terms}
+
+    def _index(self, article):
+        position = len(self._articles)
+        tokens = tokenize(f"{article.get('title', '')} {article.get('abstract', '')}")
+        self._articles.append(article)
+        self._positions[article['id']] = position
+        self._lengths.append(len(tokens))
+        for term, count in Counter(tokens).items():
+            self._postings.setdefault(term, {})[position] = count
+
+    def _rebuild(self, articles):
+        self._articles = []
+        self._positions = {}
+        self._lengths = []
+        self._postings = {}
+        for article in articles:
+            self._index(article)
+        logger.info(f"BM25 index rebuilt with {len(self._articles)} articles")
+
+    def _scores(self, terms):
+        scores = np.zeros(len(self._articles), dtype=np.float64)
+        if not self._articles:
+            return scores
+        lengths = np.asarray(self._lengths, dtype=np.float64)
+        average_length = lengths.mean() or 1.0
+        document_count = len(self._articles)
+        for term in terms:
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            positions = np.fromiter(postings.keys(), dtype=np.int64, count=len(postings))
+            frequencies = np.fromiter(postings.values(), dtype=np.float64, count=len(postings))
+            idf = np.log(1 + (document_count - len(postings) + 0.5) / (len(postings) + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * lengths[positions] / average_length)
+            scores[positions] += idf * frequencies * (self.k1 + 1) / (frequencies + norm)
+        return scores
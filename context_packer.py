@@ -0,0 +1,98 @@
+import re
+
+NO_ARTICLES_CONTEXT = "No specific articles found. Please provide a general response based on your knowledge."
+
+
+def estimate_tokens(text):
+    # Roughly four characters per token for English prose
+    return len(text) // 4 + 1
+
+
+def publication_year(article):
+    published = str(article.get('published', ''))
+    return int(published) if published.isdigit() else 0
+
+
+def normalize_title(title):
+    return ' '.join(re.findall(r"[a-z0-9]+", (title or '').lower()))
+
+
+def trim_to_tokens(text, max_tokens):
+    max_chars = max(max_tokens, 0) * 4
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars]
+    # Prefer ending on a sentence, then on a word
+    sentence_end = cut.rfind('. ')
+    if sentence_end > max_chars // 2:
+        return cut[:sentence_end + 1]
+    return cut.rsplit(' ', 1)[0] + '...'
+
+
+def pack_articles(articles, max_articles, token_budget):
+    """Select and trim articles so the context stays within a token budget.
+
+    ``articles`` are expected in relevance order. Duplicates (by PMID or
+    normalized title) and records missing a title, abstract or authors are
+    dropped, the first ``max_articles`` are kept (fewer if their headers
+    alone would use up the budget), abstracts are trimmed to share the
+    budget, and the result is ordered newest first with relevance breaking
+    ties.
+    """
+    seen = set()
+    selected = []
+    for article in articles:
+        if not (article.get('title') and article.get('abstract') and article.get('authors')):
+            continue
+        keys = {('id', article.get('id')), ('title', normalize_title(article.get('title')))}
+        if keys & seen:
+            continue
+        seen |= keys
+        selected.append(article)
+        if len(selected) == max_articles:
+            break
+
+    if not selected:
+        return []
+
+    # Headers are kept whole, so only the most relevant articles whose headers
+    # leave room for some abstract are packed; abstracts share what is left
+    remaining = token_budget
+    for count, article in enumerate(selected):
+        header_tokens = estimate_tokens(format_article_header(article))
+        if header_tokens >= remaining:
+            selected = selected[:count]
+            break
+        remaining -= header_tokens
+    abstract_tokens = [estimate_tokens(article['abstract']) for article in selected]
+    allowances = [0] * len(selected)
+    for count, index in enumerate(sorted(range(len(selected)), key=lambda i: abstract_tokens[i])):
+        share = max(remaining, 0) // (len(selected) - count)
+        allowances[index] = min(abstract_tokens[index], share)
+        remaining -= allowances[index]
+
+    packed = []
+    for rank, (article, allowance) in enumerate(zip(selected, allowances)):
+        if allowance <= 0:
+            # Budget ran out; an empty abstract would only invite a citation with nothing behind it
+            continue
+        record = dict(article)
+        record['abstract'] = trim_to_tokens(article['abstract'], allowance)
+        record['relevance_rank'] = rank
+        packed.append(record)
+
+    packed.sort(key=lambda record: (-publication_year(record), record['relevance_rank']))
+    return packed
+
+
+def format_article_header(article):
+    return f"Title: {article['title']}\nAuthors: {', '.join(article['authors'])}\nPublished: {article['published']}"
+
+
+def format_context(packed_articles):
+    if not packed_articles:
+        return NO_ARTICLES_CONTEXT
+    return "\n\n".join(
+        f"{format_article_header(article)}\nAbstract: {article['abstract']}"
+        for article in packed_articles
+    )
@@ -0,0 +1,150 @@
+import itertools
+import logging
+import threading
+import time
+from collections import deque
+from queue import Full
+
+from metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+FINISHED_STATUSES = ("done", "failed")
+
+
+class Job:
+    """One queued pipeline request with its status and partial output.
+
+    The job doubles as the pipeline's placeholder: each render of the
+    streamed answer is kept as ``text`` and bumps ``version`` so pollers can
+    wait for the next change instead of spinning.
+    """
+
+    def __init__(self, job_id, question, level, context=None, source_articles=None):
+        self.id = job_id
+        self.question = question
+        self.level = level
+        self.context = context
+        # Articles to answer from instead of searching, when they are already known
+        self.source_articles = source_articles
+        self.status = "queued"
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.articles = None
+        self.text = ""
+        self.result = None
+        self.error = None
+        self.version = 0
+        self._condition = threading.Condition()
+
+    @property
+    def finished(self):
+        return self.status in FINISHED_STATUSES
+
+    def markdown(self, text):
+        self.update(text=text)
+
+    def set_articles(self, articles):
+        self.update(articles=articles)
+
+    def wait_for_update(self, version, timeout=None):
+        # Blocks until the job changes from the given version (or finishes) and returns a snapshot
+        with self._condition:
+            self._condition.wait_for(lambda: self.version != version or self.finished, timeout)
+            return self.snapshot()
+
+    def snapshot(self):
+        with self._condition:
+            return {
+                'id': self.id,
+                'status': self.status,
+                'version': self.version,
+                'articles': self.articles,
+                'text': self.text,
+                'result': self.result,
+                'error': self.error
+            }
+
+    def update(self, **fields):
+        with self._condition:
+            for name, value in fields.items():
+                setattr(self, name, value)
+            self.version += 1
+            self._condition.notify_all()
+
+
+class JobQueue:
+    """Bounded worker pool that runs submitted jobs in FIFO order.
+
+    At most ``workers`` jobs run at once and at most ``max_queued`` wait;
+    ``submit`` raises ``queue.Full`` beyond that so callers can push back.
+    Finished jobs stay available to pollers for ``retention_seconds``.
+    """
+
+    def __init__(self, handler, workers=4, max_queued=32, retention_seconds=600):
+        self.handler = handler
+        self.workers = workers
+        self.max_queued = max_queued
+        self.retention_seconds = retention_seconds
+        self._ids = itertools.count(1)
+        self._pending = deque()
+        self._jobs = {}
+        self._running = 0
+        self._condition = threading.Condition()
+        for index in range(workers):
+            threading.Thread(target=self._work, name=f"job-worker-{index}", daemon=True).start()
+
+    def submit(self, question, level, context=None, source_articles=None):
+        with self._condition:
+            self._expire()
+            if len(self._pending) >= self.max_queued:
+                METRICS.increment("jobs_total", status="rejected")
+                raise Full(f"{len(self._pending)} jobs already waiting")
+            job = Job(f"job-{next(self._ids)}", question, level, context, source_articles)
+            self._jobs[job.id] = job
+            self._pending.append(job)
+            self._condition.notify()
+        logger.info(f"Job {job.id} queued at position {self.position(job.id)}")
+        return job
+
+    def get(self, job_id):
+        with self._condition:
+            return self._jobs.get(job_id)
+
+    def position(self, job_id):
+        # 1-based place in line while waiting, 0 once the job has started
+        with self._condition:
+            for index, job in enumerate(self._pending):
+                if job.id == job_id:
+                    return index + 1
+            return 0
+
+    def stats(self):
+        with self._condition:
+            return {'queued': len(self._pending), 'running': self._running, 'workers': self.workers}
+
+    def _work(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._pending)
+                job = self._pending.popleft()
+                self._running += 1
+            METRICS.observe("job_queue_wait_seconds", time.time() - job.submitted_at)
+            job.update(status="running", started_at=time.time())
+            try:
+                result = self.handler(job)
+            except Exception as e:
+                logger.exception(f"Job {job.id} failed")
+                job.update(status="failed", error=str(e), finished_at=time.time())
+            else:
+                job.update(status="done", result=result, finished_at=time.time())
+            finally:
+                with self._condition:
+                    self._running -= 1
+            METRICS.increment("jobs_total", status=job.status)
+
+    def _expire(self):
+        cutoff = time.time() - self.retention_seconds
+        for job_id in [job_id for job_id, job in self._jobs.items() if job.finished and job.finished_at < cutoff]:
+            del self._jobs[job_id]
@@ -0,0 +1,141 @@
+import math
+import os
+import re
+from collections import Counter
+
+from bm25_index import tokenize
+
+TERMS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mesh_terms.tsv")
+
+# Conversational words that survive the stopword list but make poor PubMed terms
+FILLER_WORDS = frozenset("""
+about age aged also any could get handle help helps just know like month months much need normal ok okay old
+really some tips want way ways week weeks would year years
+""".split())
+
+_TERMINAL = None
+
+
+def content_terms(text):
+    # Words of a question worth searching for, in order
+    terms = []
+    for token in tokenize(text):
+        if len(token) > 2 and token not in FILLER_WORDS and token not in terms:
+            terms.append(token)
+    return terms
+
+
+def singular(token):
+    return token[:-1] if len(token) > 3 and token.endswith("s") and not token.endswith("ss") else token
+
+
+def match_tokens(text):
+    # Possessives and plural "s" are dropped so "toddler's" and "toddlers" match "toddler"
+    text = re.sub(r"['’]s\b", "", (text or "").lower())
+    return [singular(token) for token in re.findall(r"[a-z0-9]+", text)]
+
+
+def load_terms(path=TERMS_PATH):
+    # One "heading<TAB>broader heading<TAB>entry|terms" row per line; lines starting with # are comments
+    terms = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip() or line.startswith("#"):
+                continue
+            heading, broader, entry_terms = (line.rstrip("\n").split("\t") + ["", ""])[:3]
+            terms.append((heading, broader or None, [term for term in entry_terms.split("|") if term]))
+    return terms
+
+
+class KeywordExtractor:
+    """Dictionary-based PubMed keyword extraction.
+
+    Entry terms are matched against the question with a word-level trie
+    (longest match wins) and the headings they map to are ranked by TF-IDF,
+    preferring deeper, more specific headings. ``document_frequencies`` is a
+    callable returning ``(document_count, {token: document_frequency})`` for
+    the corpus the IDF should come from; without it every heading has the same IDF.
+    """
+
+    def __init__(self, terms, document_frequencies=None, max_keywords=4):
+        self.max_keywords = max_keywords
+        self.document_frequencies = document_frequencies
+        self._trie = {}
+        self._broader = {}
+        for heading, broader, entry_terms in terms:
+            self._broader[heading] = broader
+            for term in [heading, *entry_terms]:
+                self._insert(match_tokens(term), heading)
+        self._depths = {heading: self._depth(heading) for heading in self._broader}
+
+    def extract(self, question):
+        # Ranked headings plus the share of the question's content words they account for
+        tokens = match_tokens(question)
+        matches = self._match(tokens)
+        if not matches:
+            return [], 0.0
+
+        counts = Counter(heading for heading, _, _ in matches)
+        first_seen = {}
+        for heading, start, _ in matches:
+            first_seen.setdefault(heading, start)
+
+        heading_tokens = {heading: tokenize(heading) for heading in counts}
+        document_count, frequencies = 0, {}
+        if self.document_frequencies:
+            document_count, frequencies = self.document_frequencies(
+                {token for heading_terms in heading_tokens.values() for token in heading_terms}
+            )
+
+        def score(heading):
+            # Rarest token of the heading in the corpus stands in for the phrase's document frequency
+            document_frequency = min((frequencies.get(token, 0) for token in heading_tokens[heading]), default=0)
+            idf = math.log(1 + (document_count + 1) / (document_frequency + 1))
+            return counts[heading] * idf * self._depths.get(heading, 1)
+
+        ranked = sorted(counts, key=lambda heading: (-score(heading), first_seen[heading]))
+        keywords = ranked[:self.max_keywords]
+
+        matched = {token for _, start, end in matches for token in tokens[start:end]}
+        terms = content_terms(question)
+        confidence = sum(singular(term) in matched for term in terms) / len(terms) if terms else 0.0
+        return keywords, confidence
+
+    def _insert(self, tokens, heading):
+        if not tokens:
+            return
+        node = self._trie
+        for token in tokens:
+            node = node.setdefault(token, {})
+        # The first heading listed for an entry term keeps it
+        node.setdefault(_TERMINAL, heading)
+
+    def _match(self, tokens):
+        # Greedy left-to-right longest match; returns (heading, start, end) spans
+        matches = []
+        start = 0
+        while start < len(tokens):
+            node = self._trie
+            longest = None
+            for position in range(start, len(tokens)):
+                node = node.get(tokens[position])
+                if node is None:
+                    break
+                if _TERMINAL in node:
+                    longest = (node[_TERMINAL], start, position + 1)
+            if longest:
+                matches.append(longest)
+                start = longest[2]
+            else:
+                start += 1
+        return matches
+
+    def _depth(self, heading):
+        depth = 1
+        seen = {heading}
+        broader = self._broader.get(heading)
+        while broader and broader not in seen:
+            seen.add(broader)
+            depth += 1
+            broader = self._broader.get(broader)
+        return depth
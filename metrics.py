@@ -0,0 +1,157 @@
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_current_trace = contextvars.ContextVar("current_trace", default=None)
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(labels, **extra):
+    items = list(labels) + list(extra.items())
+    if not items:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in items) + "}"
+
+
+class MetricsRegistry:
+    """Process-wide latency histograms and counters.
+
+    Histograms keep the last ``window`` observations per series and report
+    p50/p95/p99 over that window; counters are cumulative.
+    """
+
+    def __init__(self, window=1000):
+        self.window = window
+        self._histograms = defaultdict(lambda: deque(maxlen=self.window))
+        self._histogram_totals = defaultdict(lambda: [0, 0.0])
+        self._counters = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def observe(self, name, value, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._histograms[key].append(value)
+            totals = self._histogram_totals[key]
+            totals[0] += 1
+            totals[1] += value
+
+    def increment(self, name, amount=1, **labels):
+        with self._lock:
+            self._counters[(name, _label_key(labels))] += amount
+
+    @contextmanager
+    def span(self, stage, **labels):
+        # Times a pipeline stage and adds it to the current request's trace, if any
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start, **labels)
+
+    def record(self, stage, seconds, **labels):
+        self.observe("pipeline_stage_seconds", seconds, stage=stage, **labels)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.append({
+                'stage': stage,
+                **labels,
+                'start': round(time.perf_counter() - seconds - trace.started, 4),
+                'seconds': round(seconds, 4)
+            })
+
+    def snapshot(self):
+        with self._lock:
+            histograms = {key: (np.asarray(values), list(self._histogram_totals[key])) for key, values in self._histograms.items()}
+            counters = dict(self._counters)
+        return {
+            'histograms': [
+                {
+                    'name': name,
+                    'labels': dict(labels),
+                    'count': count,
+                    'sum': round(total, 6),
+                    'p50': float(np.percentile(values, 50)),
+                    'p95': float(np.percentile(values, 95)),
+                    'p99': float(np.percentile(values, 99))
+                }
+                for (name, labels), (values, (count, total)) in histograms.items()
+                if len(values)
+            ],
+            'counters': [
+                {'name': name, 'labels': dict(labels), 'value': value}
+                for (name, labels), value in counters.items()
+            ]
+        }
+
+    def render_prometheus(self):
+        lines = []
+        snapshot = self.snapshot()
+        for histogram in snapshot['histograms']:
+            labels = list(histogram['labels'].items())
+            for quantile in ("p50", "p95", "p99"):
+                lines.append(f"{histogram['name']}{_format_labels(labels, quantile=f'0.{quantile[1:]}')} {histogram[quantile]}")
+            lines.append(f"{histogram['name']}_count{_format_labels(labels)} {histogram['count']}")
+            lines.append(f"{histogram['name']}_sum{_format_labels(labels)} {histogram['sum']}")
+        for counter in snapshot['counters']:
+            lines.append(f"{counter['name']}{_format_labels(list(counter['labels'].items()))} {counter['value']}")
+        return "\n".join(lines) + "\n"
+
+    def write_json(self, path):
+        # Written to a temporary file first so readers never see a partial snapshot
+        temporary_path = f"{path}.tmp"
+        with open(temporary_path, "w") as f:
+            json.dump({'generated_at': time.time(), **self.snapshot()}, f)
+        os.replace(temporary_path, path)
+
+    def serve(self, port, host="127.0.0.1"):
+        registry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = registry.render_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+        logger.info(f"Metrics endpoint listening on port {port}")
+        return server
+
+
+class Trace(list):
+    def __init__(self):
+        super().__init__()
+        self.started = time.perf_counter()
+
+
+@contextmanager
+def trace():
+    # Collects every span recorded in this context (and contexts copied from it)
+    current = Trace()
+    token = _current_trace.set(current)
+    try:
+        yield current
+    finally:
+        _current_trace.reset(token)
+
+
+METRICS = MetricsRegistry()
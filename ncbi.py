@@ -0,0 +1,300 @@
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from contextvars import copy_context
+from email.utils import parsedate_to_datetime
+from itertools import islice
+from urllib.parse import urlencode
+from xml.etree import ElementTree
+
+import requests
+import streamlit as st
+from requests.adapters import HTTPAdapter
+
+from article_store import ArticleStore
+from metrics import METRICS
+from rate_limiter import TokenBucket
+from resources import shared_resource
+from search_cache import SearchCache, normalize_keywords, search_cache_key
+
+logger = logging.getLogger(__name__)
+
+NCBI_CONFIG = st.secrets["ncbi"]
+NCBI_BASE_URL = NCBI_CONFIG["base_url"]
+
+NCBI_TIMEOUT = (
+    NCBI_CONFIG.get("connect_timeout", 3.05),
+    NCBI_CONFIG.get("read_timeout", 20)
+)
+EFETCH_BATCH_SIZE = NCBI_CONFIG.get("efetch_batch_size", 200)
+# How long the OR fallback search waits for the AND search before sending its own request
+FALLBACK_HEAD_START_SECONDS = NCBI_CONFIG.get("fallback_head_start_seconds", 1.0)
+
+# Optional identification; an API key raises NCBI's limit from 3 to 10 requests/s
+NCBI_IDENTITY = {
+    key: NCBI_CONFIG[key]
+    for key in ("api_key", "tool", "email")
+    if NCBI_CONFIG.get(key)
+}
+NCBI_REQUESTS_PER_SECOND = NCBI_CONFIG.get("requests_per_second", 10 if "api_key" in NCBI_IDENTITY else 3)
+
+NCBI_MAX_RETRIES = NCBI_CONFIG.get("max_retries", 4)
+NCBI_BACKOFF_SECONDS = NCBI_CONFIG.get("backoff_seconds", 0.5)
+NCBI_MAX_BACKOFF_SECONDS = NCBI_CONFIG.get("max_backoff_seconds", 30)
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+assert NCBI_BASE_URL, "NCBI_BASE_URL is not set"
+
+@shared_resource
+def get_article_store():
+    store_config = st.secrets.get("article_store", {})
+    return ArticleStore(
+        path=store_config.get("path", "article_store.sqlite3"),
+        ttl_seconds=store_config.get("ttl_seconds", 7 * 24 * 3600),
+        max_entries=store_config.get("max_entries", 5000)
+    )
+
+@shared_resource
+def get_search_cache():
+    cache_config = st.secrets.get("search_cache", {})
+    return SearchCache(
+        max_entries=cache_config.get("max_entries", 1000),
+        ttl_seconds=cache_config.get("ttl_seconds", 3600)
+    )
+
+@shared_resource
+def get_http_session():
+    # One keep-alive connection pool for NCBI E-utilities, shared by all sessions
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=32)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    logger.info("NCBI HTTP session initialized")
+    return session
+
+@shared_resource
+def get_ncbi_executor():
+    return ThreadPoolExecutor(max_workers=16, thread_name_prefix="ncbi")
+
+@shared_resource
+def get_ncbi_rate_limiter():
+    # Shared by every session and batch worker in the process
+    return TokenBucket(NCBI_REQUESTS_PER_SECOND)
+
+def ncbi_get(url, stream=False, skip=None):
+    if NCBI_IDENTITY:
+        url = f"{url}&{urlencode(NCBI_IDENTITY)}"
+
+    # Throttled and retried on 429/5xx and connection errors with jittered exponential backoff
+    for attempt in range(NCBI_MAX_RETRIES + 1):
+        get_ncbi_rate_limiter().acquire()
+        if skip is not None and skip.is_set():
+            # No longer needed by the time a token came free; hand the token back unused
+            get_ncbi_rate_limiter().release()
+            return None
+        try:
+            response = get_http_session().get(url, timeout=NCBI_TIMEOUT, stream=stream)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            if attempt == NCBI_MAX_RETRIES:
+                raise
+            delay = backoff_delay(attempt)
+            logger.warning(f"NCBI request failed ({e}), retrying in {delay:.2f}s")
+        else:
+            if response.status_code not in RETRY_STATUS_CODES or attempt == NCBI_MAX_RETRIES:
+                return response
+            delay = retry_after_delay(response)
+            if delay is None:
+                delay = backoff_delay(attempt)
+            response.close()
+            logger.warning(f"NCBI returned {response.status_code}, retrying in {delay:.2f}s")
+        time.sleep(delay)
+
+def backoff_delay(attempt):
+    return random.uniform(0, min(NCBI_MAX_BACKOFF_SECONDS, NCBI_BACKOFF_SECONDS * 2 ** attempt))
+
+def retry_after_delay(response):
+    retry_after = response.headers.get("Retry-After")
+    if not retry_after:
+        return None
+    try:
+        delay = float(retry_after)
+    except ValueError:
+        try:
+            delay = parsedate_to_datetime(retry_after).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return None
+    return min(max(delay, 0), NCBI_MAX_BACKOFF_SECONDS)
+
+def search_ncbi(keywords, num_results):
+    return list(iter_search_ncbi(keywords, num_results))
+
+def iter_search_ncbi(keywords, num_results):
+    keywords = normalize_keywords(keywords)
+    if not keywords:
+        logger.warning("No keywords provided for NCBI search.")
+        return
+
+    found = 0
+
+    # The more general search only goes out if the relevant one comes back empty or slow
+    executor = get_ncbi_executor()
+    relevant_found = threading.Event()
+    relevant_future = executor.submit(copy_context().run, esearch_with_history, keywords, num_results, 'AND')
+    general_future = executor.submit(copy_context().run, fallback_esearch, keywords, num_results, relevant_future, relevant_found)
+
+    relevant_id_list, webenv, query_key = relevant_future.result()
+    if relevant_id_list:
+        relevant_found.set()
+        for article in stream_article_details(relevant_id_list, webenv, query_key):
+            found += 1
+            yield article
+
+    if not found:
+        # If no results, use the more general search
+        general_search = general_future.result()
+        if general_search is None:
+            general_search = esearch_with_history(keywords, num_results, 'OR')
+        general_id_list, webenv, query_key = general_search
+        for article in stream_article_details(general_id_list, webenv, query_key):
+            found += 1
+            yield article
+
+    logger.info(f"NCBI search results: {found} articles found")
+    logger.info(f"NCBI search cache stats: {get_search_cache().stats()}")
+
+def fallback_esearch(keywords, num_results, relevant_future, relevant_found):
+    # Returns None when the relevant search made the OR request unnecessary
+    try:
+        relevant_id_list = relevant_future.result(timeout=FALLBACK_HEAD_START_SECONDS)[0]
+    except TimeoutError:
+        relevant_id_list = []
+    if relevant_id_list:
+        return None
+    return esearch_with_history(keywords, num_results, 'OR', skip=relevant_found)
+
+def esearch_with_history(keywords, num_results, operator, skip=None):
+    # Returns the ID list plus the history server WebEnv/query_key (None when served from cache),
+    # or None when skip was set before the request could be sent
+    search_cache = get_search_cache()
+    cache_key = search_cache_key(keywords, operator, num_results)
+    id_list = search_cache.get(cache_key)
+    if id_list is not None:
+        logger.info(f"NCBI {operator} search served from cache: {len(id_list)} IDs")
+        return id_list, None, None
+
+    query = '+'.join(keywords) if operator == 'AND' else '+OR+'.join(keywords)
+    search_url = f"{NCBI_BASE_URL}esearch.fcgi?db=pubmed&term={query}&retmode=json&retmax={num_results}&sort=relevance&usehistory=y"
+    try:
+        with METRICS.span("esearch", operator=operator):
+            search_response = ncbi_get(search_url, skip=skip)
+    except requests.RequestException as e:
+        logger.error(f"NCBI {operator} search request failed: {e}")
+        return [], None, None
+    if search_response is None:
+        logger.info(f"NCBI {operator} search no longer needed, skipped")
+        return None
+    METRICS.increment("ncbi_response_bytes_total", len(search_response.content), endpoint="esearch")
+    logger.info(f"NCBI {operator} search API response status: {search_response.status_code}")
+
+    if search_response.status_code != 200:
+        return [], None, None
+
+    try:
+        search_result = search_response.json().get('esearchresult', {})
+    except ValueError as e:
+        # NCBI occasionally answers 200 with an HTML or truncated body
+        logger.error(f"NCBI {operator} search returned invalid JSON: {e}")
+        return [], None, None
+    id_list = search_result.get('idlist', [])
+    search_cache.set(cache_key, id_list)
+    return id_list, search_result.get('webenv'), search_result.get('querykey')
+
+def stream_article_details(id_list, webenv=None, query_key=None):
+    if not id_list:
+        return
+
+    # Stored articles are available straight away; the rest arrive batch by batch
+    article_store = get_article_store()
+    articles_by_id = article_store.get_many(id_list)
+    for pmid in id_list:
+        if pmid in articles_by_id:
+            yield articles_by_id[pmid]
+
+    missing_ids = [pmid for pmid in id_list if pmid not in articles_by_id]
+    # History server positions only line up with missing_ids when nothing was stored
+    use_history = webenv and query_key and not articles_by_id
+
+    for start in range(0, len(missing_ids), EFETCH_BATCH_SIZE):
+        # The history server holds the whole result set, so never ask it for more than the IDs we wanted
+        batch_size = min(EFETCH_BATCH_SIZE, len(missing_ids) - start)
+        if use_history:
+            fetch_url = f"{NCBI_BASE_URL}efetch.fcgi?db=pubmed&WebEnv={webenv}&query_key={query_key}&retstart={start}&retmax={batch_size}&retmode=xml"
+        else:
+            batch_ids = missing_ids[start:start + batch_size]
+            fetch_url = f"{NCBI_BASE_URL}efetch.fcgi?db=pubmed&id={','.join(batch_ids)}&retmode=xml"
+
+        batch_articles = []
+        for article in islice(iter_efetch_articles(fetch_url), batch_size):
+            batch_articles.append(article)
+            yield article
+        article_store.put_many(batch_articles)
+
+def iter_efetch_articles(fetch_url):
+    try:
+        with METRICS.span("efetch"):
+            fetch_response = ncbi_get(fetch_url, stream=True)
+    except requests.RequestException as e:
+        logger.error(f"NCBI fetch request failed: {e}")
+        return
+    logger.info(f"NCBI fetch API response status: {fetch_response.status_code}")
+
+    with fetch_response:
+        if fetch_response.status_code != 200:
+            logger.error(f"Error fetching detailed data from NCBI: {fetch_response.text}")
+            return
+
+        # Parse incrementally and drop each article once it has been read so memory stays flat
+        fetch_response.raw.decode_content = True
+        root = None
+        # Time spent reading and parsing, excluding the time the consumer holds each article
+        parse_seconds = 0.0
+        resumed = time.perf_counter()
+        try:
+            for event, element in ElementTree.iterparse(fetch_response.raw, events=("start", "end")):
+                if root is None:
+                    root = element
+                elif event == "end" and element.tag == "PubmedArticle":
+                    article = parse_article(element)
+                    root.clear()
+                    parse_seconds += time.perf_counter() - resumed
+                    yield article
+                    resumed = time.perf_counter()
+        except (ElementTree.ParseError, requests.RequestException) as e:
+            logger.error(f"Error parsing NCBI fetch response: {e}")
+        finally:
+            METRICS.record("xml_parse", parse_seconds)
+            METRICS.increment("ncbi_response_bytes_total", fetch_response.raw.tell(), endpoint="efetch")
+
+def parse_article(article):
+    title = article.find('.//ArticleTitle')
+    abstract = article.find('.//AbstractText')
+    pubmed_id = article.find('.//ArticleId[@IdType="pubmed"]')
+    doi = article.find('.//ArticleId[@IdType="doi"]')
+    pub_date = article.find('.//PubDate/Year')
+    authors = [
+        author.find('LastName').text + " " + author.find('ForeName').text
+        for author in article.findall('.//Author')
+        if author.find('LastName') is not None and author.find('ForeName') is not None
+    ]
+    return {
+        'title': title.text if title is not None else 'No title',
+        'abstract': abstract.text if abstract is not None else 'No abstract',
+        'id': pubmed_id.text if pubmed_id is not None else 'No ID',
+        'published': pub_date.text if pub_date is not None else 'No date',
+        'authors': authors,
+        'doi': doi.text if doi is not None else None,
+        'source': 'PubMed',
+        'url': f"https://pubmed.ncbi.nlm.nih.gov/{pubmed_id.text}/" if pubmed_id is not None else 'No URL'
+    }
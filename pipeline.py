@@ -0,0 +1,706 @@
+import logging
+import threading
+import time
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+from contextvars import copy_context
+
+import streamlit as st
+from openai import OpenAI, AssistantEventHandler, NotFoundError, OpenAIError
+from typing_extensions import override
+
+from answer_cache import SemanticAnswerCache, hashed_embedding
+from bm25_index import BM25Index, tokenize
+from context_packer import format_context, pack_articles
+from jobs import JobQueue
+from keyword_extractor import TERMS_PATH, KeywordExtractor, content_terms, load_terms
+from metrics import METRICS, trace
+from prompts import (
+    ANSWER_INSTRUCTIONS,
+    ANSWER_MESSAGE,
+    KEYWORDS_INSTRUCTIONS,
+    KEYWORDS_MESSAGE,
+    OPTIMIZE_INSTRUCTIONS,
+    OPTIMIZE_MESSAGE,
+    SMS_INSTRUCTIONS,
+    SMS_MESSAGE
+)
+from rate_limiter import TokenBucket
+from render_scheduler import RenderScheduler
+from resources import shared_resource
+from run_coordinator import RunCoordinator
+from single_flight import FlightPlaceholder, SingleFlight, question_key
+from sources import FixtureSource, PubMedSource, fan_out, merge_articles
+
+logger = logging.getLogger(__name__)
+
+OPENAI_API_KEY = st.secrets["openai"]["api_key"]
+
+RERANK_CONFIG = st.secrets.get("rerank", {})
+RERANK_OVERFETCH_FACTOR = RERANK_CONFIG.get("overfetch_factor", 2)
+RERANK_INDEX_ONLY = RERANK_CONFIG.get("index_only", True)
+RERANK_MIN_COVERAGE = RERANK_CONFIG.get("min_coverage", 1.0)
+
+# Per-mode limits on how many articles and how many prompt tokens the context may use
+CONTEXT_CONFIG = st.secrets.get("context", {})
+CONTEXT_LIMITS = {
+    "Parent": {
+        "max_articles": CONTEXT_CONFIG.get("parent_max_articles", 10),
+        "token_budget": CONTEXT_CONFIG.get("parent_token_budget", 3000)
+    },
+    "Doctor/Researcher": {
+        "max_articles": CONTEXT_CONFIG.get("doctor_max_articles", 15),
+        "token_budget": CONTEXT_CONFIG.get("doctor_token_budget", 6000)
+    }
+}
+
+# Speculative PubMed search from the raw question, run while the LLM extracts keywords
+PREFETCH_CONFIG = st.secrets.get("prefetch", {})
+PREFETCH_ENABLED = PREFETCH_CONFIG.get("enabled", True)
+PREFETCH_MAX_KEYWORDS = PREFETCH_CONFIG.get("max_keywords", 4)
+PREFETCH_MIN_OVERLAP = PREFETCH_CONFIG.get("min_overlap", 0.5)
+
+# "llm" asks the assistant for keywords; "local" matches a bundled term list and only asks when unsure
+KEYWORDS_CONFIG = st.secrets.get("keywords", {})
+KEYWORD_EXTRACTOR = KEYWORDS_CONFIG.get("extractor", "llm")
+KEYWORD_MIN_CONFIDENCE = KEYWORDS_CONFIG.get("min_confidence", 0.6)
+
+# Run overrides per LLM stage; None keeps the assistant's default. The helper stages only emit a
+# line, so they get small caps and the fast model; the SMS cap fits 450 characters plus emojis.
+LLM_CONFIG = st.secrets.get("llm", {})
+LLM_STAGE_DEFAULTS = {
+    'llm_optimize': ("optimize", {"model": "gpt-4o-mini", "temperature": 0.3, "max_completion_tokens": 80}),
+    'llm_keywords': ("keywords", {"model": "gpt-4o-mini", "temperature": 0.3, "max_completion_tokens": 40}),
+    'llm_answer': ("answer", {"model": None, "temperature": None, "max_completion_tokens": 2000}),
+    'llm_sms': ("sms", {"model": "gpt-4o-mini", "temperature": None, "max_completion_tokens": 180})
+}
+LLM_STAGES = {
+    stage: {key: LLM_CONFIG.get(section, {}).get(key, default) for key, default in defaults.items()}
+    for stage, (section, defaults) in LLM_STAGE_DEFAULTS.items()
+}
+
+# Concurrent identical questions at the same level share one pipeline run
+SINGLE_FLIGHT_ENABLED = st.secrets.get("single_flight", {}).get("enabled", True)
+
+# PubMed plus any [sources.<name>] tables with a fixture path; each source gets its own deadline
+SOURCES_CONFIG = st.secrets.get("sources", {})
+
+# Generations run on a bounded pool outside the Streamlit script so reruns don't lose them
+JOBS_CONFIG = st.secrets.get("jobs", {})
+
+METRICS_CONFIG = st.secrets.get("metrics", {})
+
+RENDER_INTERVAL_SECONDS = st.secrets.get("render", {}).get("interval_seconds", 0.15)
+RENDER_CHAR_THRESHOLD = st.secrets.get("render", {}).get("char_threshold", 400)
+
+assert OPENAI_API_KEY, "OPENAI_API_KEY is not set"
+
+@shared_resource
+def get_bm25_index():
+    return BM25Index(max_documents=RERANK_CONFIG.get("max_documents", 20000))
+
+@shared_resource
+def get_run_coordinator():
+    return RunCoordinator()
+
+@shared_resource
+def get_job_queue():
+    return JobQueue(
+        run_job,
+        workers=JOBS_CONFIG.get("workers", 4),
+        max_queued=JOBS_CONFIG.get("max_queued", 32),
+        retention_seconds=JOBS_CONFIG.get("retention_seconds", 600)
+    )
+
+@shared_resource
+def get_single_flight():
+    return SingleFlight()
+
+@shared_resource
+def get_keyword_extractor():
+    return KeywordExtractor(
+        load_terms(KEYWORDS_CONFIG.get("terms_path", TERMS_PATH)),
+        document_frequencies=get_bm25_index().document_frequencies,
+        max_keywords=KEYWORDS_CONFIG.get("max_keywords", 4)
+    )
+
+@shared_resource
+def get_retrieval_sources():
+    sources = []
+    pubmed_config = SOURCES_CONFIG.get("pubmed", {})
+    if pubmed_config.get("enabled", True):
+        sources.append(PubMedSource(deadline_seconds=pubmed_config.get("deadline_seconds", 30)))
+    for name, source_config in SOURCES_CONFIG.items():
+        if name == "pubmed" or not isinstance(source_config, Mapping) or not source_config.get("path"):
+            continue
+        if not source_config.get("enabled", True):
+            continue
+        sources.append(FixtureSource(
+            source_config["path"],
+            name=source_config.get("name", name),
+            deadline_seconds=source_config.get("deadline_seconds", 5),
+            latency_seconds=source_config.get("latency_seconds", 0)
+        ))
+    logger.info(f"Retrieval sources: {[source.name for source in sources]}")
+    return sources
+
+@shared_resource
+def get_retrieval_executor():
+    return ThreadPoolExecutor(max_workers=SOURCES_CONFIG.get("max_workers", 16), thread_name_prefix="retrieval")
+
+@shared_resource
+def get_prefetch_executor():
+    # Separate from the NCBI executor, whose workers the prefetched searches wait on
+    return ThreadPoolExecutor(max_workers=PREFETCH_CONFIG.get("max_workers", 8), thread_name_prefix="prefetch")
+
+@shared_resource
+def get_openai_rate_limiter():
+    # Shared by every session and batch worker in the process
+    return TokenBucket(st.secrets["openai"].get("requests_per_minute", 500) / 60)
+
+@shared_resource
+def get_openai_client():
+    # One client per process; it keeps its own keep-alive connection pool across reruns and sessions
+    openai_client = OpenAI(
+        api_key=OPENAI_API_KEY,
+        base_url=st.secrets["openai"].get("base_url"),
+        timeout=st.secrets["openai"].get("timeout", 120),
+        max_retries=st.secrets["openai"].get("max_retries", 2)
+    )
+    logger.info("OpenAI client initialized")
+    return openai_client
+
+client = get_openai_client()
+
+class EventHandler(AssistantEventHandler):
+    def __init__(self, placeholder=None):
+        super().__init__()
+        self.placeholder = placeholder
+        # Deltas are buffered and rendered at a bounded rate rather than on every token
+        self.renderer = RenderScheduler(
+            placeholder,
+            interval=RENDER_INTERVAL_SECONDS,
+            char_threshold=RENDER_CHAR_THRESHOLD
+        )
+        # Used to report time to first token
+        self.started_at = time.perf_counter()
+        self.first_token_seconds = None
+        logger.info("EventHandler initialized")
+
+    @property
+    def text_accumulated(self):
+        return self.renderer.text
+
+    @override
+    def on_text_created(self, text):
+        logger.info(f"Text created: {text.value}")
+
+    @override
+    def on_text_delta(self, delta, snapshot):
+        if self.first_token_seconds is None:
+            self.first_token_seconds = time.perf_counter() - self.started_at
+        self.renderer.append(delta.value)
+
+    @override
+    def on_text_done(self, text):
+        self.renderer.flush()
+        logger.info(f"Text done: {text.value}")
+
+def create_assistant():
+    assistant = client.beta.assistants.create(
+        name="Research Assistant",
+        instructions="""
+        You are a research assistant. Accuracy is of the utmost importance
+        """,
+        model="gpt-4o-mini"
+    )
+    logger.info(f"Assistant created: {assistant.id}")
+    return assistant
+    
+@shared_resource
+def get_assistant():
+    # Reuse the configured assistant and only create one when it is missing
+    assistant_id = st.secrets.get("assistant", {}).get("id")
+    if assistant_id:
+        try:
+            assistant = client.beta.assistants.retrieve(assistant_id)
+            logger.info(f"Assistant loaded: {assistant.id}")
+            return assistant
+        except NotFoundError:
+            logger.warning(f"Configured assistant {assistant_id} not found, creating a new one")
+    return create_assistant()
+
+def openai_embedding(text):
+    response = client.embeddings.create(
+        model=st.secrets.get("answer_cache", {}).get("embedding_model", "text-embedding-3-small"),
+        input=text
+    )
+    return response.data[0].embedding
+
+@shared_resource
+def get_answer_cache():
+    cache_config = st.secrets.get("answer_cache", {})
+    # "local" swaps in a hashed bag-of-words embedding that needs no API calls
+    embed = hashed_embedding if cache_config.get("embedding") == "local" else openai_embedding
+    return SemanticAnswerCache(
+        embed,
+        similarity_threshold=cache_config.get("similarity_threshold", 0.92),
+        ttl_seconds=cache_config.get("ttl_seconds", 24 * 3600),
+        max_entries=cache_config.get("max_entries", 500)
+    )
+
+def lookup_cached_answer(optimized_question, length):
+    try:
+        return get_answer_cache().lookup(optimized_question, length)
+    except OpenAIError as e:
+        logger.warning(f"Answer cache lookup failed: {e}")
+        return None
+
+def store_cached_answer(optimized_question, length, full_response, text_message, articles):
+    try:
+        get_answer_cache().store(optimized_question, length, full_response, text_message, articles)
+    except OpenAIError as e:
+        logger.warning(f"Answer cache store failed: {e}")
+
+def stage_options(stage):
+    # Unset (empty) values fall back to the assistant's own defaults
+    return {key: value for key, value in LLM_STAGES.get(stage, {}).items() if value not in (None, "")}
+
+def stream_run(thread_id, assistant_id, handler, stage, **run_options):
+    run_options = {**stage_options(stage), **run_options}
+    get_openai_rate_limiter().acquire()
+    with METRICS.span(stage), get_run_coordinator().run(thread_id):
+        handler.started_at = time.perf_counter()
+        with client.beta.threads.runs.stream(
+            thread_id=thread_id,
+            assistant_id=assistant_id,
+            event_handler=handler,
+            **run_options
+        ) as stream:
+            stream.until_done()
+
+    if getattr(handler.current_run, "status", None) == "incomplete":
+        logger.warning(f"{stage} run stopped at its {run_options.get('max_completion_tokens')} token cap")
+        METRICS.increment("llm_truncated_runs_total", stage=stage)
+    if handler.first_token_seconds is not None:
+        METRICS.observe("llm_time_to_first_token_seconds", handler.first_token_seconds, stage=stage)
+    usage = getattr(handler.current_run, "usage", None)
+    if usage is not None:
+        METRICS.increment("llm_tokens_total", usage.prompt_tokens, stage=stage, kind="prompt")
+        METRICS.increment("llm_tokens_total", usage.completion_tokens, stage=stage, kind="completion")
+
+def run_assistant(thread_id, assistant_id, task, stage, placeholder=None, instructions=None):
+    # Static instructions ride along as additional_instructions so they form a cacheable prefix
+    handler = EventHandler(placeholder)
+    logger.info(f"Running assistant {assistant_id} for thread {thread_id} with task: {task}")
+    stream_run(thread_id, assistant_id, handler, stage, additional_instructions=instructions)
+    logger.info(f"Assistant run completed. Accumulated text: {handler.text_accumulated[:50]}...")
+    return handler.text_accumulated
+
+def create_thread():
+    thread = client.beta.threads.create()
+    get_run_coordinator().register(thread.id)
+    logger.info(f"Thread created: {thread.id}")
+    return thread
+
+def delete_thread(thread_id):
+    get_run_coordinator().forget(thread_id)
+    try:
+        client.beta.threads.delete(thread_id)
+        logger.info(f"Thread deleted: {thread_id}")
+    except OpenAIError as e:
+        logger.warning(f"Could not delete thread {thread_id}: {e}")
+
+@contextmanager
+def scratch_thread():
+    # Short-lived thread for the small helper steps, deleted as soon as they finish
+    thread = create_thread()
+    try:
+        yield thread.id
+    finally:
+        threading.Thread(target=delete_thread, args=(thread.id,), daemon=True).start()
+
+def add_message_to_thread(thread_id, content, role="user"):
+    run_coordinator = get_run_coordinator()
+    if run_coordinator.is_known(thread_id):
+        # Every run on this thread went through the coordinator, so no need to ask the API
+        run_coordinator.wait_until_idle(thread_id)
+    else:
+        wait_for_active_runs(thread_id)
+        run_coordinator.register(thread_id)
+    
+    message = client.beta.threads.messages.create(
+        thread_id=thread_id,
+        role=role,
+        content=content
+    )
+    logger.info(f"Message added to thread {thread_id}: {content[:50]}...")
+    return message
+
+def wait_for_active_runs(thread_id):
+    # Fallback for threads whose run state we don't know, e.g. after a crash or restart
+    runs = client.beta.threads.runs.list(thread_id=thread_id)
+    
+    active_run = next((run for run in runs if run.status in ["queued", "in_progress"]), None)
+    
+    while active_run:
+        logger.info(f"Waiting for active run to complete for thread {thread_id}")
+        time.sleep(1)
+        runs = client.beta.threads.runs.list(thread_id=thread_id)
+        active_run = next((run for run in runs if run.status in ["queued", "in_progress"]), None)
+
+class PipelineContext:
+    # Per-question results shared between pipeline stages so each LLM step runs once
+    def __init__(self, question):
+        self.question = question
+        self.optimized_question = None
+        self.keywords = None
+
+def optimize_question(thread_id, question, context=None):
+    context = context or PipelineContext(question)
+    if context.optimized_question is not None:
+        logger.info(f"Reusing optimized question: {context.optimized_question}")
+        return context.optimized_question
+
+    task = OPTIMIZE_MESSAGE.format(question=question)
+    add_message_to_thread(thread_id, task)
+    response_text = run_assistant(thread_id, get_assistant().id, task, 'llm_optimize', instructions=OPTIMIZE_INSTRUCTIONS)
+    if response_text:
+        optimized_question = response_text.strip()
+        logger.info(f"Optimized question: {optimized_question}")
+    else:
+        logger.warning("No optimized question generated")
+        optimized_question = question
+    context.optimized_question = optimized_question
+    return optimized_question
+
+def extract_keywords(thread_id, question, context=None):
+    context = context or PipelineContext(question)
+    if context.keywords is not None:
+        logger.info(f"Reusing extracted keywords: {context.keywords}")
+        return context.keywords
+
+    optimized_question = optimize_question(thread_id, question, context)
+    task = KEYWORDS_MESSAGE.format(question=optimized_question)
+    add_message_to_thread(thread_id, task)
+    response_text = run_assistant(thread_id, get_assistant().id, task, 'llm_keywords', instructions=KEYWORDS_INSTRUCTIONS)
+    if response_text:
+        keywords = response_text.split(',')
+        clean_keywords = [keyword.strip() for keyword in keywords]
+        logger.info(f"Extracted keywords: {clean_keywords}")
+    else:
+        logger.warning("No keywords extracted")
+        clean_keywords = []
+    context.keywords = clean_keywords
+    return clean_keywords
+
+def extract_keywords_locally(question, context):
+    # Skips the optimize and keyword runs when the term list accounts for enough of the question
+    with METRICS.span('local_keywords'):
+        keywords, confidence = get_keyword_extractor().extract(question)
+    if not keywords or confidence < KEYWORD_MIN_CONFIDENCE:
+        logger.info(f"Local keywords {keywords} below confidence ({confidence:.2f}), asking the assistant")
+        METRICS.increment("keyword_extraction_total", source="llm_fallback")
+        return None
+    logger.info(f"Local keywords: {keywords} (confidence {confidence:.2f})")
+    METRICS.increment("keyword_extraction_total", source="local")
+    context.keywords = keywords
+    if context.optimized_question is None:
+        context.optimized_question = question
+    return keywords
+
+def generate_response(thread_id, question, length, articles, placeholder=None, context=None):
+    if not question.strip():
+        logger.error("No research question provided.")
+        return "", ""
+    
+    if not articles:
+        logger.warning("No articles found. Generating response without context.")
+    
+    def generate_prompt(optimized_question, articles):
+        # Deduplicate, trim to the mode's token budget and order newest first
+        limits = CONTEXT_LIMITS.get(length, CONTEXT_LIMITS["Parent"])
+        packed_articles = pack_articles(articles, limits["max_articles"], limits["token_budget"])
+        logger.info(f"Packed {len(packed_articles)} articles into the prompt context")
+        # Variable content only; the level's instructions are sent separately and stay identical across requests
+        return ANSWER_MESSAGE.format(
+            context=format_context(packed_articles),
+            optimized_question=optimized_question,
+            question=question
+        )
+    
+    optimized_question = optimize_question(thread_id, question, context)
+    prompt = generate_prompt(optimized_question, articles)
+
+    add_message_to_thread(thread_id, prompt)
+    
+    handler = EventHandler(placeholder)
+    stream_run(
+        thread_id,
+        get_assistant().id,
+        handler,
+        'llm_answer',
+        additional_instructions=ANSWER_INSTRUCTIONS.get(length, ANSWER_INSTRUCTIONS["Parent"])
+    )
+    
+    response = handler.text_accumulated
+    logger.info(f"Generated response: {response[:50]}...")
+
+    # Generate text message version on a fresh thread so the answer prompt isn't sent again
+    text_message_prompt = SMS_MESSAGE.format(question=question, response=response)
+    text_message_handler = EventHandler()
+    with scratch_thread() as text_message_thread_id:
+        add_message_to_thread(text_message_thread_id, text_message_prompt)
+        stream_run(text_message_thread_id, get_assistant().id, text_message_handler, 'llm_sms', additional_instructions=SMS_INSTRUCTIONS)
+    
+    text_message = text_message_handler.text_accumulated
+    logger.info(f"Generated text message: {text_message[:50]}...")
+    
+    return response, text_message
+
+def speculative_keywords(question):
+    # Cheap local stand-in for the LLM keywords: content words of the question, in order
+    return content_terms(question)[:PREFETCH_MAX_KEYWORDS]
+
+def keyword_overlap(speculative, keywords):
+    # Share of the LLM keyword terms that the speculative search also used
+    keyword_terms = set(tokenize(' '.join(keywords)))
+    if not keyword_terms:
+        return 0.0
+    return len(keyword_terms & set(speculative)) / len(keyword_terms)
+
+def start_speculative_search(question, num_results):
+    keywords = speculative_keywords(question)
+    if not PREFETCH_ENABLED or not keywords:
+        return None
+
+    def speculative_search():
+        with METRICS.span("speculative_search"):
+            return search_sources(keywords, num_results * RERANK_OVERFETCH_FACTOR)
+
+    logger.info(f"Speculative search keywords: {keywords}")
+    future = get_prefetch_executor().submit(copy_context().run, speculative_search)
+    future.keywords = keywords
+    return future
+
+def speculative_results(speculative, keywords):
+    # Wait for the prefetch only when it searched for roughly the same thing; otherwise take it if it's done
+    if speculative is None:
+        return [], False
+    overlapping = keyword_overlap(speculative.keywords, keywords) >= PREFETCH_MIN_OVERLAP
+    if not overlapping and not speculative.done():
+        speculative.cancel()
+        METRICS.increment("speculative_search_total", outcome="discarded")
+        return [], False
+    try:
+        return speculative.result(), overlapping
+    except Exception as e:
+        logger.warning(f"Speculative search failed: {e}")
+        return [], False
+
+def search_sources(keywords, num_results):
+    return fan_out(get_retrieval_sources(), keywords, num_results, get_retrieval_executor())
+
+def retrieve_articles(keywords, question, num_results, speculative=None):
+    bm25_index = get_bm25_index()
+
+    # Repeat topics can be answered from abstracts we already hold
+    if RERANK_INDEX_ONLY and keywords:
+        indexed_articles = bm25_index.search(' '.join(keywords), num_results, min_coverage=RERANK_MIN_COVERAGE)
+        if len(indexed_articles) >= num_results:
+            logger.info(f"Articles served from local index: {len(indexed_articles)}")
+            if speculative is not None:
+                speculative.cancel()
+            return bm25_index.rank(question, indexed_articles, num_results)
+
+    # Over-fetch from every source and keep the abstracts that best match the question
+    num_candidates = num_results * RERANK_OVERFETCH_FACTOR
+    candidates, overlapping = speculative_results(speculative, keywords)
+    if overlapping and len(candidates) >= num_candidates:
+        logger.info(f"Using speculative search results: {len(candidates)} articles")
+        METRICS.increment("speculative_search_total", outcome="used")
+    else:
+        if candidates:
+            METRICS.increment("speculative_search_total", outcome="merged")
+        candidates = merge_articles([candidates, search_sources(keywords, num_candidates)])
+    return bm25_index.rank(question, candidates, num_results)
+
+@contextmanager
+def timed(timings, stage):
+    start = time.perf_counter()
+    try:
+        with METRICS.span(stage):
+            yield
+    finally:
+        timings[stage] = round(time.perf_counter() - start, 3)
+
+def start_metrics_export():
+    # Optional Prometheus-style endpoint; the JSON snapshot is rewritten after every request
+    port = METRICS_CONFIG.get("port")
+    if not port:
+        return
+    host = METRICS_CONFIG.get("host", "127.0.0.1")
+    try:
+        METRICS.serve(int(port), host)
+    except OSError as e:
+        # Another process (a second app instance, batch.py) may already hold the port
+        logger.warning(f"Could not serve metrics on {host}:{port}: {e}")
+
+# Once per process, at import, so a taken port can't fail individual requests
+start_metrics_export()
+
+def export_metrics():
+    json_path = METRICS_CONFIG.get("json_path")
+    if json_path:
+        try:
+            METRICS.write_json(json_path)
+        except OSError as e:
+            logger.warning(f"Could not write metrics to {json_path}: {e}")
+
+def run_pipeline(question, length, placeholder=None, context=None, on_articles=None, articles=None):
+    # Keyword extraction -> NCBI search -> answer generation, usable from the UI or headless.
+    # Passing articles (e.g. fetched for the same question at the other level) skips straight to the answer.
+    if not SINGLE_FLIGHT_ENABLED:
+        return execute_pipeline(question, length, placeholder, context, on_articles, articles)
+
+    single_flight = get_single_flight()
+    key = question_key(question, length)
+    flight, leader = single_flight.join(key)
+    if not leader:
+        METRICS.increment("single_flight_total", role="follower")
+        logger.info(f"Joining in-flight pipeline for: {question}")
+        return follow_pipeline(flight, question, length, placeholder, context, on_articles, articles)
+
+    METRICS.increment("single_flight_total", role="leader")
+
+    def publish_articles(articles):
+        flight.publish_articles(articles)
+        if on_articles:
+            on_articles(articles)
+
+    try:
+        result = execute_pipeline(question, length, FlightPlaceholder(flight, placeholder), context, publish_articles, articles)
+    except BaseException as e:
+        # Includes Streamlit stopping or rerunning the leader's script, so followers are never stranded
+        flight.finish(error=e)
+        raise
+    else:
+        flight.finish(result)
+    finally:
+        single_flight.land(key, flight)
+    return result
+
+def follow_pipeline(flight, question, length, placeholder=None, context=None, on_articles=None, articles=None):
+    # Replays what the leader has streamed so far, then follows it live
+    start = time.perf_counter()
+    articles_shown = False
+    for event, value in flight.follow():
+        if event == 'articles' and on_articles:
+            on_articles(value)
+            articles_shown = True
+        elif event == 'text' and placeholder is not None:
+            placeholder.markdown(value)
+    try:
+        result = flight.result()
+    except Exception:
+        raise
+    except BaseException:
+        # The leader's session was stopped mid-run; answer this question directly instead
+        logger.info(f"In-flight pipeline was interrupted, running it again for: {question}")
+        return execute_pipeline(question, length, placeholder, context, None if articles_shown else on_articles, articles)
+
+    if context is not None:
+        context.optimized_question = result['optimized_question']
+        context.keywords = result['keywords']
+    return {
+        **result,
+        'question': question,
+        'coalesced': True,
+        'timings': {'total': round(time.perf_counter() - start, 3)},
+        'trace': []
+    }
+
+def execute_pipeline(question, length, placeholder=None, context=None, on_articles=None, articles=None):
+    context = context or PipelineContext(question)
+    timings = {}
+    result = {
+        'question': question,
+        'level': length,
+        'cached': False,
+        'coalesced': False,
+        'timings': timings
+    }
+
+    num_results = CONTEXT_LIMITS.get(length, CONTEXT_LIMITS["Parent"])["max_articles"]
+    with trace() as spans, timed(timings, 'total'):
+        speculative = None
+        needs_keywords = articles is None and context.keywords is None
+        if needs_keywords and KEYWORD_EXTRACTOR == "local":
+            with timed(timings, 'extract_keywords'):
+                needs_keywords = extract_keywords_locally(question, context) is None
+
+        with ExitStack() as stack:
+            if needs_keywords:
+                scratch_thread_id = stack.enter_context(scratch_thread())
+                with timed(timings, 'optimize_question'):
+                    optimize_question(scratch_thread_id, question, context)
+            optimized_question = context.optimized_question or question
+
+            # Near-duplicate questions at the same level are answered from the cache,
+            # which only needs the optimized question, so a hit skips keywords and search
+            with timed(timings, 'answer_cache'):
+                cached_answer = lookup_cached_answer(optimized_question, length)
+
+            if needs_keywords and not cached_answer:
+                with timed(timings, 'extract_keywords'):
+                    # Hide the PubMed round trips behind the keyword run
+                    speculative = start_speculative_search(question, num_results)
+                    extract_keywords(scratch_thread_id, question, context)
+        keywords = context.keywords or []
+        logger.info(f"Keywords: {keywords}")
+
+        if cached_answer:
+            articles = cached_answer['articles']
+            full_response = cached_answer['full_response']
+            text_message = cached_answer['text_message']
+            result['cached'] = True
+            if on_articles:
+                on_articles(articles)
+        else:
+            if articles is None:
+                # Search NCBI and re-rank against the optimized question
+                with timed(timings, 'search_ncbi'):
+                    articles = retrieve_articles(keywords, optimized_question, num_results, speculative)
+            if on_articles:
+                on_articles(articles)
+
+            # Each question is answered on its own thread, deleted afterwards
+            with timed(timings, 'generate_response'), scratch_thread() as thread_id:
+                full_response, text_message = generate_response(thread_id, question, length, articles, placeholder, context)
+
+            if full_response:
+                store_cached_answer(optimized_question, length, full_response, text_message, articles)
+
+    export_metrics()
+    result.update({
+        'trace': spans,
+        'optimized_question': optimized_question,
+        'keywords': keywords,
+        'answer': full_response,
+        'text_message': text_message,
+        'articles': articles,
+        'pmids': [article['id'] for article in articles]
+    })
+    return result
+
+def run_job(job):
+    # The job is its own placeholder, so pollers see the answer as it streams
+    return run_pipeline(
+        job.question,
+        job.level,
+        placeholder=job,
+        context=job.context,
+        on_articles=job.set_articles,
+        articles=job.source_articles
+    )
@@ -0,0 +1,37 @@
+import time
+
+
+class RenderScheduler:
+    """Coalesces streamed text and re-renders a placeholder at a bounded rate.
+
+    Chunks are buffered in a list and the placeholder is only updated once
+    ``interval`` seconds have passed or ``char_threshold`` characters are
+    pending since the last render. ``flush`` forces a render.
+    """
+
+    def __init__(self, placeholder=None, interval=0.15, char_threshold=400):
+        self.placeholder = placeholder
+        self.interval = interval
+        self.char_threshold = char_threshold
+        self._chunks = []
+        self._pending_chars = 0
+        self._last_flush = time.monotonic()
+
+    @property
+    def text(self):
+        return ''.join(self._chunks)
+
+    def append(self, chunk):
+        if not chunk:
+            return
+        self._chunks.append(chunk)
+        self._pending_chars += len(chunk)
+        if (self._pending_chars >= self.char_threshold
+                or time.monotonic() - self._last_flush >= self.interval):
+            self.flush()
+
+    def flush(self):
+        if self.placeholder is not None and self._pending_chars:
+            self.placeholder.markdown(self.text)
+        self._pending_chars = 0
+        self._last_flush = time.monotonic()
@@ -0,0 +1,24 @@
+import threading
+from functools import wraps
+
+
+def shared_resource(function):
+    """Cache a zero-argument getter for the life of the process.
+
+    Unlike ``functools.cache``, creation is serialized: concurrent first
+    calls wait for the one building the resource instead of each building
+    (and all but one discarding) their own.
+    """
+    lock = threading.Lock()
+    created = []
+
+    @wraps(function)
+    def getter():
+        if created:
+            return created[0]
+        with lock:
+            if not created:
+                created.append(function())
+            return created[0]
+
+    return getter
@@ -0,0 +1,60 @@
+import json
+import time
+
+from single_flight import question_key
+
+HISTORY_FIELDS = ('question', 'level', 'optimized_question', 'keywords', 'answer', 'text_message', 'articles')
+
+
+class ResultHistory:
+    """Per-session list of finished answers, newest last.
+
+    Keeps at most ``max_results`` entries and roughly ``max_bytes`` of
+    serialized content; the oldest entries are dropped first, but the newest
+    one is always kept.
+    """
+
+    def __init__(self, max_results=10, max_bytes=2_000_000):
+        self.max_results = max_results
+        self.max_bytes = max_bytes
+        self._entries = []
+        self._sizes = []
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add(self, result):
+        entry = {field: result.get(field) for field in HISTORY_FIELDS}
+        entry['created_at'] = time.time()
+        self._remove(self.find(entry['question'], entry['level']))
+        self._entries.append(entry)
+        self._sizes.append(len(json.dumps(entry, default=str)))
+        while len(self._entries) > 1 and (len(self._entries) > self.max_results or sum(self._sizes) > self.max_bytes):
+            self._entries.pop(0)
+            self._sizes.pop(0)
+        return entry
+
+    def latest(self):
+        return self._entries[-1] if self._entries else None
+
+    def earlier(self):
+        # Everything but the latest entry, newest first
+        return self._entries[-2::-1]
+
+    def find(self, question, level):
+        key = question_key(question, level)
+        return next((entry for entry in reversed(self._entries) if question_key(entry['question'], entry['level']) == key), None)
+
+    def promote(self, entry):
+        # Makes an existing entry the latest again
+        size = self._remove(entry)
+        if size is not None:
+            self._entries.append(entry)
+            self._sizes.append(size)
+
+    def _remove(self, entry):
+        for index, existing in enumerate(self._entries):
+            if existing is entry:
+                del self._entries[index]
+                return self._sizes.pop(index)
+        return None
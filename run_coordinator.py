@@ -0,0 +1,55 @@
+import logging
+import threading
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class RunCoordinator:
+    """Tracks which Assistants threads have a run in flight in this process.
+
+    Runs started through ``run`` are known to be finished once the stream is
+    done, so messages can be added without polling the API. Threads the
+    coordinator has not seen (e.g. after a restart) or whose run ended with
+    an error are reported as unknown so callers can fall back to listing.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._active = set()
+        self._known = set()
+
+    def register(self, thread_id):
+        with self._condition:
+            self._known.add(thread_id)
+
+    def forget(self, thread_id):
+        with self._condition:
+            self._known.discard(thread_id)
+
+    def is_known(self, thread_id):
+        with self._condition:
+            return thread_id in self._known
+
+    @contextmanager
+    def run(self, thread_id):
+        with self._condition:
+            self._condition.wait_for(lambda: thread_id not in self._active)
+            self._active.add(thread_id)
+        completed = False
+        try:
+            yield
+            completed = True
+        finally:
+            with self._condition:
+                self._active.discard(thread_id)
+                if completed:
+                    self._known.add(thread_id)
+                else:
+                    # The remote run may still be going, so stop vouching for this thread
+                    self._known.discard(thread_id)
+                self._condition.notify_all()
+
+    def wait_until_idle(self, thread_id, timeout=None):
+        with self._condition:
+            return self._condition.wait_for(lambda: thread_id not in self._active, timeout)
@@ -0,0 +1,56 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_keywords(keywords):
+    # Lower-case, collapse whitespace and drop duplicates while keeping the ranked order
+    normalized = []
+    for keyword in keywords:
+        term = ' '.join(keyword.lower().split())
+        if term and term not in normalized:
+            normalized.append(term)
+    return normalized
+
+
+def search_cache_key(keywords, operator, num_results):
+    # AND and OR queries are commutative, so the key ignores keyword order
+    return (operator, num_results, tuple(sorted(normalize_keywords(keywords))))
+
+
+class SearchCache:
+    """In-memory LRU cache of esearch ID lists with a per-entry TTL."""
+
+    def __init__(self, max_entries=1000, ttl_seconds=3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.time() - entry[0] < self.ttl_seconds:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return list(entry[1])
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, id_list):
+        with self._lock:
+            self._entries[key] = (time.time(), list(id_list))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries)}
@@ -0,0 +1,110 @@
+import re
+import threading
+
+
+def question_key(question, level):
+    # Case, punctuation and spacing differences don't make a question different
+    return (' '.join(re.findall(r"[a-z0-9]+", (question or '').lower())), level)
+
+
+class Flight:
+    """One in-flight pipeline run that duplicate callers attach to.
+
+    The leader publishes the retrieved articles and each render of the
+    streamed answer; ``follow`` replays whatever has been published so far
+    and then yields updates live until the leader finishes. Only the latest
+    answer text is kept, since every render is a full snapshot.
+    """
+
+    def __init__(self):
+        self.followers = 0
+        self._condition = threading.Condition()
+        self._articles = None
+        self._text = None
+        self._version = 0
+        self._done = False
+        self._result = None
+        self._error = None
+
+    def publish_articles(self, articles):
+        with self._condition:
+            self._articles = articles
+            self._condition.notify_all()
+
+    def publish_text(self, text):
+        with self._condition:
+            self._text = text
+            self._version += 1
+            self._condition.notify_all()
+
+    def finish(self, result=None, error=None):
+        with self._condition:
+            self._result = result
+            self._error = error
+            self._done = True
+            self._condition.notify_all()
+
+    def follow(self):
+        # Yields ("articles", list) once and ("text", str) per new render, then returns when done
+        articles_seen = False
+        version_seen = 0
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: (
+                    self._done
+                    or self._version != version_seen
+                    or (self._articles is not None and not articles_seen)
+                ))
+                articles, text, version, done = self._articles, self._text, self._version, self._done
+            if articles is not None and not articles_seen:
+                articles_seen = True
+                yield 'articles', articles
+            if version != version_seen:
+                version_seen = version
+                yield 'text', text
+            if done:
+                return
+
+    def result(self):
+        with self._condition:
+            self._condition.wait_for(lambda: self._done)
+            if self._error is not None:
+                raise self._error
+            return self._result
+
+
+class FlightPlaceholder:
+    """Placeholder for the leader that also publishes every render to its followers."""
+
+    def __init__(self, flight, placeholder=None):
+        self.flight = flight
+        self.placeholder = placeholder
+
+    def markdown(self, text):
+        self.flight.publish_text(text)
+        if self.placeholder is not None:
+            self.placeholder.markdown(text)
+
+
+class SingleFlight:
+    """Process-wide registry of in-flight pipeline runs keyed by question and level."""
+
+    def __init__(self):
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def join(self, key):
+        # Returns the flight for key and whether the caller is its leader
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                flight.followers += 1
+                return flight, False
+            flight = self._flights[key] = Flight()
+            return flight, True
+
+    def land(self, key, flight):
+        # Called by the leader once finished; later callers start a new flight
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
@@ -0,0 +1,150 @@
+import json
+import logging
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import TimeoutError
+from contextvars import copy_context
+from xml.etree import ElementTree
+
+from bm25_index import BM25Index
+from context_packer import normalize_title
+from metrics import METRICS
+from ncbi import parse_article, search_ncbi
+
+logger = logging.getLogger(__name__)
+
+# Same placeholders parse_article uses, so fixture rows render and pack like PubMed ones
+ARTICLE_DEFAULTS = {
+    'title': 'No title',
+    'abstract': 'No abstract',
+    'id': 'No ID',
+    'published': 'No date',
+    'authors': [],
+    'doi': None,
+    'url': 'No URL'
+}
+
+
+class RetrievalSource(ABC):
+    """A place articles can be searched for.
+
+    Subclasses implement ``search(keywords, num_results)`` and return article
+    dicts in the shape the UI cards and the prompt use: title, abstract, id,
+    published, authors, source and url, plus doi when known. A source that
+    hasn't answered within ``deadline_seconds`` is left out of the results.
+    """
+
+    name = "source"
+
+    def __init__(self, deadline_seconds=30):
+        self.deadline_seconds = deadline_seconds
+
+    @abstractmethod
+    def search(self, keywords, num_results):
+        ...
+
+
+class PubMedSource(RetrievalSource):
+    name = "PubMed"
+
+    def search(self, keywords, num_results):
+        return search_ncbi(keywords, num_results)
+
+
+class FixtureSource(RetrievalSource):
+    """Offline source over a local file of articles.
+
+    Reads either PubMed efetch XML or JSON Lines of article dicts (each with
+    an ``id``; missing fields get the same placeholders as PubMed articles)
+    and ranks them with BM25, preferring articles that contain every keyword.
+    ``latency_seconds`` adds an artificial delay, e.g. to exercise deadlines.
+    """
+
+    def __init__(self, path, name="Fixture", deadline_seconds=5, latency_seconds=0):
+        super().__init__(deadline_seconds)
+        self.name = name
+        self.latency_seconds = latency_seconds
+        self.index = BM25Index()
+        self.index.add(self._load(path))
+        logger.info(f"{name} source loaded {len(self.index)} articles from {path}")
+
+    def search(self, keywords, num_results):
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        query = ' '.join(keywords)
+        # Articles with every keyword first, otherwise any that share one
+        return self.index.search(query, num_results) or self.index.search(query, num_results, min_coverage=0.01)
+
+    def _load(self, path):
+        if path.endswith(".xml"):
+            articles = [parse_article(element) for element in ElementTree.parse(path).getroot().iter("PubmedArticle")]
+            return [{**article, 'source': self.name} for article in articles]
+        with open(path, "r") as f:
+            return [self._with_defaults(json.loads(line)) for line in f if line.strip()]
+
+    def _with_defaults(self, record):
+        article = {**ARTICLE_DEFAULTS, 'authors': [], 'source': self.name}
+        article.update((field, value) for field, value in record.items() if value is not None)
+        return article
+
+
+def article_keys(article):
+    # Any shared PMID, DOI or normalized title marks two records as the same article
+    pmid = article.get('id')
+    if pmid and pmid != 'No ID':
+        yield ('id', str(pmid))
+    if article.get('doi'):
+        yield ('doi', article['doi'].lower())
+    title = normalize_title(article.get('title'))
+    if title and title != 'no title':
+        yield ('title', title)
+
+
+def merge_articles(result_lists):
+    # Keeps the first record of each article, in source order, filling gaps from later duplicates
+    merged = []
+    positions = {}
+    for articles in result_lists:
+        for article in articles:
+            keys = list(article_keys(article))
+            position = next((positions[key] for key in keys if key in positions), None)
+            if position is None:
+                position = len(merged)
+                merged.append(dict(article))
+            else:
+                existing = merged[position]
+                for field, value in article.items():
+                    if existing.get(field) in (None, '', 'No abstract', 'No date', 'No title', []):
+                        existing[field] = value
+            for key in keys:
+                positions.setdefault(key, position)
+    return merged
+
+
+def fan_out(sources, keywords, num_results, executor):
+    # Queries every source at once and waits for each only until its own deadline
+    start = time.monotonic()
+
+    def timed_search(source):
+        with METRICS.span("source_search", source=source.name):
+            return source.search(keywords, num_results)
+
+    futures = [(source, executor.submit(copy_context().run, timed_search, source)) for source in sources]
+    result_lists = []
+    for source, future in futures:
+        remaining = source.deadline_seconds - (time.monotonic() - start)
+        try:
+            articles = future.result(timeout=max(remaining, 0))
+        except TimeoutError:
+            # A late source keeps running so its caches still warm up, but nobody waits for it
+            future.cancel()
+            logger.warning(f"{source.name} missed its {source.deadline_seconds}s deadline")
+            METRICS.increment("retrieval_source_total", source=source.name, outcome="timeout")
+            continue
+        except Exception as e:
+            logger.error(f"{source.name} search failed: {e}")
+            METRICS.increment("retrieval_source_total", source=source.name, outcome="error")
+            continue
+        METRICS.increment("retrieval_source_total", source=source.name, outcome="ok")
+        result_lists.append(articles)
+    return merge_articles(result_lists)